@@ -5,32 +5,59 @@ Author: Antony Picon
 
 Endpoints:
     POST /calcular - Ejecutar simulación hidráulica
+    POST /calcular_batch - Ejecutar un barrido de simulaciones vectorizado
     GET /health - Health check para monitoreo
 """
 
 import os
+import math
+import asyncio
 import logging
-from typing import Optional
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from math import log10 as _log10
+from typing import Annotated, Literal, Optional, get_args
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, status
+from fastapi import FastAPI, HTTPException, Request, Response, status
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field, field_validator
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, ValidationError, model_validator
 from dotenv import load_dotenv
 
+import numpy as np
+import orjson
 import CoolProp.CoolProp as CP
-import fluids
+from fluids.friction import friction_factor as _friction_factor
+from scipy.interpolate import RegularGridInterpolator
 
-# Cargar variables de entorno
-load_dotenv()
+try:
+    from numba import njit
+except ImportError:  # numba es opcional: sin él el kernel se ejecuta en Python puro
+    njit = None
 
-# Configuración de logging
-logging.basicConfig(
-    level=logging.DEBUG if os.getenv("DEBUG", "false").lower() == "true" else logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
 logger = logging.getLogger("pipeflow")
 
+
+@lru_cache(maxsize=1)
+def cargar_entorno() -> None:
+    """Carga las variables de `.env` una sola vez, al arrancar la aplicación y no al importar."""
+    load_dotenv()
+
+
+def configurar_logging() -> None:
+    """Configura el logging raíz; nivel DEBUG si la variable DEBUG es true."""
+    logging.basicConfig(
+        level=logging.DEBUG if os.getenv("DEBUG", "false").lower() == "true" else logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+
+
 # Constantes de validación física
 LIMITS = {
     "presion": {"min": 1e3, "max": 1e9, "unit": "Pa"},           # 0.01 bar - 10,000 bar
@@ -41,15 +68,61 @@ LIMITS = {
     "k_accesorios": {"min": 0, "max": 1000, "unit": "-"}          # Sin límite práctico
 }
 
-FLUIDOS_SOPORTADOS = ["Methane", "Water", "Ethane", "Hydrogen", "Nitrogen", "CarbonDioxide", "Propane"]
+NombreFluido = Literal["Methane", "Water", "Ethane", "Hydrogen", "Nitrogen", "CarbonDioxide", "Propane"]
+FLUIDOS_SOPORTADOS = list(get_args(NombreFluido))
+
+# Geometría por defecto de la tubería
+ESPESOR_PARED = 0.005       # m
+RUGOSIDAD_ACERO = 4.5e-5    # Acero comercial estándar (m)
+
+# Número máximo de puntos por solicitud en /calcular_batch
+PUNTOS_LOTE_MAX = 10000
+
+# Estados CoolProp de bajo nivel por fluido (se crean en el startup).
+# AbstractState no es thread-safe: todo acceso se hace bajo el bloqueo del fluido.
+ESTADOS: dict[str, CP.AbstractState] = {}
+BLOQUEOS_ESTADO = {nombre: threading.Lock() for nombre in FLUIDOS_SOPORTADOS}
+
+# Tablas de propiedades interpoladas por fluido (opcional, TABLAS_PROPIEDADES=true)
+TABLAS: dict[str, "TablaPropiedades"] = {}
+# Por debajo de este tamaño de lote la interpolación cuesta más que CoolProp + caché
+LOTE_MIN_INTERPOLACION = 16
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifecycle manager para startup y shutdown."""
+    cargar_entorno()
+    configurar_logging()
     logger.info("🚀 PipeFlow Pro API iniciando...")
+    logger.info(f"   CORS configurado para: {origenes_permitidos()}")
     logger.info(f"   Fluidos soportados: {', '.join(FLUIDOS_SOPORTADOS)}")
+    usar_tablas = os.getenv("TABLAS_PROPIEDADES", "false").lower() == "true"
+    procesos = int(os.getenv("PROCESOS_CALCULO", "0"))
+    # Con pool de procesos el padre no calcula: las tablas solo se construyen en los hijos
+    iniciar_motor(usar_tablas and procesos == 0)
+    if usar_tablas:
+        logger.info("   Tablas de propiedades interpoladas construidas")
+
+    app.state.pool = None
+    if procesos > 0:
+        app.state.pool = PoolCalculo(procesos, usar_tablas)
+        await app.state.pool.calentar()
+        logger.info(f"   Pool de cálculo: {procesos} procesos")
+    app.state.health_bytes = orjson.dumps(HealthResponse(
+        status="healthy",
+        version="2.0.0",
+        fluidos_disponibles=FLUIDOS_SOPORTADOS
+    ).model_dump())
+    app.state.loteador = LoteadorCalculos(
+        ventana=float(os.getenv("VENTANA_LOTE_MS", "0")) / 1000,
+        pool=app.state.pool
+    )
+    app.state.loteador.iniciar()
     yield
+    await app.state.loteador.detener()
+    if app.state.pool is not None:
+        app.state.pool.cerrar()
     logger.info("👋 PipeFlow Pro API cerrando...")
 
 
@@ -78,23 +151,39 @@ Re = (ρ × v × D) / μ
     """,
     version="2.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc"
 )
 
+
 # Configuración de CORS
-allowed_origins = os.getenv("ALLOWED_ORIGINS", "*").split(",")
-allowed_origins = [origin.strip() for origin in allowed_origins]
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=allowed_origins if "*" not in allowed_origins else ["*"],
-    allow_methods=["GET", "POST", "OPTIONS"],
-    allow_headers=["Content-Type", "Authorization"],
-    allow_credentials=True,
-)
+def origenes_permitidos() -> list[str]:
+    """Orígenes permitidos según ALLOWED_ORIGINS (separados por comas)."""
+    cargar_entorno()
+    return [origin.strip() for origin in os.getenv("ALLOWED_ORIGINS", "*").split(",")]
 
-logger.info(f"   CORS configurado para: {allowed_origins}")
+
+class CORSDesdeEntorno(CORSMiddleware):
+    """
+    CORSMiddleware que lee la configuración al construirse la pila de middleware.
+    
+    Starlette construye la pila en la primera llamada ASGI (el evento lifespan),
+    por lo que `.env` se carga al arrancar el servidor y no al importar el módulo.
+    """
+    
+    def __init__(self, app):
+        allowed_origins = origenes_permitidos()
+        super().__init__(
+            app,
+            allow_origins=allowed_origins if "*" not in allowed_origins else ["*"],
+            allow_methods=["GET", "POST", "OPTIONS"],
+            allow_headers=["Content-Type", "Authorization"],
+            allow_credentials=True,
+        )
+
+
+app.add_middleware(CORSDesdeEntorno)
 
 
 # ============================================================================
@@ -104,38 +193,43 @@ logger.info(f"   CORS configurado para: {allowed_origins}")
 class DatosEntrada(BaseModel):
     """Datos de entrada para la simulación hidráulica."""
     
-    fluido: str = Field(
+    fluido: NombreFluido = Field(
         ...,
         description="Nombre del fluido (código CoolProp)",
         json_schema_extra={"example": "Methane"}
     )
     presion: float = Field(
         ...,
-        gt=0,
+        ge=LIMITS["presion"]["min"],
+        le=LIMITS["presion"]["max"],
         description="Presión absoluta en Pascales",
         json_schema_extra={"example": 7000000}
     )
     temperatura: float = Field(
         ...,
-        gt=0,
+        ge=LIMITS["temperatura"]["min"],
+        le=LIMITS["temperatura"]["max"],
         description="Temperatura absoluta en Kelvin",
         json_schema_extra={"example": 298.15}
     )
     diametro: float = Field(
         ...,
-        gt=0,
+        ge=LIMITS["diametro"]["min"],
+        le=LIMITS["diametro"]["max"],
         description="Diámetro exterior de tubería en metros",
         json_schema_extra={"example": 0.12}
     )
     velocidad: float = Field(
         ...,
-        ge=0,
+        ge=LIMITS["velocidad"]["min"],
+        le=LIMITS["velocidad"]["max"],
         description="Velocidad de flujo en m/s",
         json_schema_extra={"example": 2.0}
     )
     longitud: float = Field(
         default=100.0,
-        gt=0,
+        ge=LIMITS["longitud"]["min"],
+        le=LIMITS["longitud"]["max"],
         description="Longitud de la tubería en metros",
         json_schema_extra={"example": 100.0}
     )
@@ -146,65 +240,6 @@ class DatosEntrada(BaseModel):
         json_schema_extra={"example": 1.5}
     )
 
-    @field_validator("fluido")
-    @classmethod
-    def validar_fluido(cls, v: str) -> str:
-        if v not in FLUIDOS_SOPORTADOS:
-            raise ValueError(
-                f"Fluido '{v}' no soportado. Opciones: {', '.join(FLUIDOS_SOPORTADOS)}"
-            )
-        return v
-
-    @field_validator("presion")
-    @classmethod
-    def validar_presion(cls, v: float) -> float:
-        lim = LIMITS["presion"]
-        if not lim["min"] <= v <= lim["max"]:
-            raise ValueError(
-                f"Presión fuera de rango válido ({lim['min']:.0e} - {lim['max']:.0e} {lim['unit']})"
-            )
-        return v
-
-    @field_validator("temperatura")
-    @classmethod
-    def validar_temperatura(cls, v: float) -> float:
-        lim = LIMITS["temperatura"]
-        if not lim["min"] <= v <= lim["max"]:
-            raise ValueError(
-                f"Temperatura fuera de rango válido ({lim['min']} - {lim['max']} {lim['unit']})"
-            )
-        return v
-
-    @field_validator("diametro")
-    @classmethod
-    def validar_diametro(cls, v: float) -> float:
-        lim = LIMITS["diametro"]
-        if not lim["min"] <= v <= lim["max"]:
-            raise ValueError(
-                f"Diámetro fuera de rango válido ({lim['min']} - {lim['max']} {lim['unit']})"
-            )
-        return v
-
-    @field_validator("velocidad")
-    @classmethod
-    def validar_velocidad(cls, v: float) -> float:
-        lim = LIMITS["velocidad"]
-        if not lim["min"] <= v <= lim["max"]:
-            raise ValueError(
-                f"Velocidad fuera de rango válido ({lim['min']} - {lim['max']} {lim['unit']})"
-            )
-        return v
-    
-    @field_validator("longitud")
-    @classmethod
-    def validar_longitud(cls, v: float) -> float:
-        lim = LIMITS["longitud"]
-        if not lim["min"] <= v <= lim["max"]:
-            raise ValueError(
-                f"Longitud fuera de rango válido ({lim['min']} - {lim['max']} {lim['unit']})"
-            )
-        return v
-
 
 class ResultadoCalculo(BaseModel):
     """Resultado de la simulación hidráulica."""
@@ -219,6 +254,91 @@ class ResultadoCalculo(BaseModel):
     advertencias: list[str] = Field(default=[], description="Advertencias de diseño")
 
 
+def _en_rango(campo: str):
+    """Tipo float restringido a los límites físicos de LIMITS[campo]."""
+    return Annotated[float, Field(ge=LIMITS[campo]["min"], le=LIMITS[campo]["max"])]
+
+
+class DatosEntradaBatch(BaseModel):
+    """
+    Datos de entrada para un barrido de simulaciones del mismo fluido.
+    
+    Cada campo acepta N valores, o un único valor que se aplica a todos los puntos.
+    """
+    
+    fluido: NombreFluido = Field(
+        ...,
+        description="Nombre del fluido (código CoolProp)",
+        json_schema_extra={"example": "Methane"}
+    )
+    presion: list[_en_rango("presion")] = Field(
+        ...,
+        min_length=1,
+        max_length=PUNTOS_LOTE_MAX,
+        description="Presiones absolutas en Pascales",
+        json_schema_extra={"example": [5000000, 7000000]}
+    )
+    temperatura: list[_en_rango("temperatura")] = Field(
+        ...,
+        min_length=1,
+        max_length=PUNTOS_LOTE_MAX,
+        description="Temperaturas absolutas en Kelvin",
+        json_schema_extra={"example": [298.15]}
+    )
+    diametro: list[_en_rango("diametro")] = Field(
+        ...,
+        min_length=1,
+        max_length=PUNTOS_LOTE_MAX,
+        description="Diámetros exteriores de tubería en metros",
+        json_schema_extra={"example": [0.12]}
+    )
+    velocidad: list[_en_rango("velocidad")] = Field(
+        ...,
+        min_length=1,
+        max_length=PUNTOS_LOTE_MAX,
+        description="Velocidades de flujo en m/s",
+        json_schema_extra={"example": [2.0]}
+    )
+    longitud: list[_en_rango("longitud")] = Field(
+        default=[100.0],
+        min_length=1,
+        max_length=PUNTOS_LOTE_MAX,
+        description="Longitudes de la tubería en metros",
+        json_schema_extra={"example": [100.0]}
+    )
+    k_accesorios: list[Annotated[float, Field(ge=0)]] = Field(
+        default=[0.0],
+        min_length=1,
+        max_length=PUNTOS_LOTE_MAX,
+        description="Sumas de coeficientes K de accesorios",
+        json_schema_extra={"example": [1.5]}
+    )
+
+    @model_validator(mode="after")
+    def validar_longitudes(self):
+        campos = ("presion", "temperatura", "diametro", "velocidad", "longitud", "k_accesorios")
+        n = max(len(getattr(self, campo)) for campo in campos)
+        for campo in campos:
+            if len(getattr(self, campo)) not in (1, n):
+                raise ValueError(
+                    f"'{campo}' debe tener 1 o {n} valores (tiene {len(getattr(self, campo))})"
+                )
+        return self
+
+
+class ResultadoCalculoBatch(BaseModel):
+    """Resultados de un barrido de simulaciones, un elemento por punto."""
+    
+    delta_p: list[float] = Field(..., description="Caídas de presión totales (Pa)")
+    reynolds: list[int] = Field(..., description="Números de Reynolds")
+    factor_f: list[float] = Field(..., description="Factores de fricción de Darcy")
+    densidad: list[float] = Field(..., description="Densidades del fluido (kg/m³)")
+    viscosidad: list[float] = Field(..., description="Viscosidades dinámicas (Pa·s)")
+    diametro_interno: list[float] = Field(..., description="Diámetros internos calculados (m)")
+    regimen: list[str] = Field(..., description="Regímenes de flujo")
+    advertencias: list[list[str]] = Field(..., description="Advertencias de diseño por punto")
+
+
 class HealthResponse(BaseModel):
     """Respuesta del health check."""
     
@@ -231,124 +351,634 @@ class HealthResponse(BaseModel):
 # MOTOR DE CÁLCULO
 # ============================================================================
 
-class MotorHidraulico:
-    """Motor de cálculo hidráulico con CoolProp y Fluids."""
+class TablaPropiedades:
+    """
+    Tabla precalculada de ln(ρ) y ln(μ) de un fluido sobre una malla ln(P) × T.
+    
+    Interpolar los logaritmos hace la densidad de gas casi lineal en la malla.
+    Solo se interpola dentro de celdas cuyos cuatro nodos son válidos, están
+    en la misma fase y cuyo centro reproduce CoolProp dentro de `tolerancia`;
+    el resto de puntos devuelve NaN para resolverse con CoolProp.
+    """
     
     def __init__(
         self,
-        d_ext: float,
-        espesor: float = 0.005,
-        longitud: float = 100,
-        rugosidad: float = 4.5e-5
+        fluido: str,
+        n_presion: int = 128,
+        n_temperatura: int = 128,
+        tolerancia: float = 1e-3
     ):
-        self.espesor = espesor
-        self.L = longitud
-        self.rugosidad = rugosidad  # Acero comercial estándar (m)
-        self.d_int = d_ext - (2 * self.espesor)
-        
-        if self.d_int <= 0:
-            raise ValueError(
-                f"Diámetro interno inválido ({self.d_int:.4f}m). "
-                f"El espesor de pared ({espesor}m) es mayor que el radio."
-            )
+        self.ln_P = np.log(np.geomspace(LIMITS["presion"]["min"], LIMITS["presion"]["max"], n_presion))
+        self.T = np.linspace(LIMITS["temperatura"]["min"], LIMITS["temperatura"]["max"], n_temperatura)
 
-    def calcular_resultados(
-        self,
-        fluido: str,
-        P: float,
-        T: float,
-        v: float,
-        k_total: float
-    ) -> ResultadoCalculo:
-        """
-        Ejecuta el cálculo hidráulico completo.
+        ln_rho = np.full((n_presion, n_temperatura), np.nan)
+        ln_mu = np.full((n_presion, n_temperatura), np.nan)
+        fase = np.full((n_presion, n_temperatura), -1)
+        estado = CP.AbstractState("HEOS", fluido)
+        for i, P in enumerate(np.exp(self.ln_P)):
+            for j, T in enumerate(self.T):
+                try:
+                    estado.update(CP.PT_INPUTS, P, T)
+                    ln_rho[i, j] = math.log(estado.rhomass())
+                    ln_mu[i, j] = math.log(estado.viscosity())
+                    fase[i, j] = estado.phase()
+                except ValueError:
+                    continue
+
+        esquina = fase[:-1, :-1]
+        self.celda_valida = (
+            (esquina >= 0)
+            & (esquina == fase[1:, :-1])
+            & (esquina == fase[:-1, 1:])
+            & (esquina == fase[1:, 1:])
+        )
+        malla = (self.ln_P, self.T)
+        self._ln_rho = RegularGridInterpolator(malla, ln_rho, bounds_error=False, fill_value=np.nan)
+        self._ln_mu = RegularGridInterpolator(malla, ln_mu, bounds_error=False, fill_value=np.nan)
+
+        # Verificación en el centro de cada celda (peor caso de la interpolación bilineal)
+        i, j = np.nonzero(self.celda_valida)
+        centros = np.column_stack((
+            (self.ln_P[i] + self.ln_P[i + 1]) / 2,
+            (self.T[j] + self.T[j + 1]) / 2
+        ))
+        ln_rho_exacta = np.full(len(centros), np.nan)
+        ln_mu_exacta = np.full(len(centros), np.nan)
+        for k, (ln_P, T) in enumerate(centros):
+            try:
+                estado.update(CP.PT_INPUTS, math.exp(ln_P), T)
+                ln_rho_exacta[k] = math.log(estado.rhomass())
+                ln_mu_exacta[k] = math.log(estado.viscosity())
+            except ValueError:
+                continue
+        # En escala logarítmica la diferencia absoluta es el error relativo
+        error = np.maximum(
+            np.abs(self._ln_rho(centros) - ln_rho_exacta),
+            np.abs(self._ln_mu(centros) - ln_mu_exacta)
+        )
+        self.celda_valida[i, j] = error <= tolerancia  # NaN (centro inválido) también descarta
+
+    def interpolar(self, P: np.ndarray, T: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """Interpola (densidad, viscosidad); NaN donde la tabla no es fiable."""
+        ln_P = np.log(P)
+        i = np.clip(np.searchsorted(self.ln_P, ln_P, side="right") - 1, 0, len(self.ln_P) - 2)
+        j = np.clip(np.searchsorted(self.T, T, side="right") - 1, 0, len(self.T) - 2)
+        puntos = np.column_stack((ln_P, T))
+        valido = self.celda_valida[i, j]
+        rho = np.where(valido, np.exp(self._ln_rho(puntos)), np.nan)
+        mu = np.where(valido, np.exp(self._ln_mu(puntos)), np.nan)
+        return rho, mu
+
+
+def iniciar_motor(usar_tablas: bool = False) -> None:
+    """
+    Crea los AbstractState por fluido y, opcionalmente, las tablas interpoladas.
+    
+    Se ejecuta en el startup y como initializer de cada proceso del pool de cálculo.
+    """
+    ESTADOS.update({nombre: CP.AbstractState("HEOS", nombre) for nombre in FLUIDOS_SOPORTADOS})
+    if usar_tablas:
+        TABLAS.update({nombre: TablaPropiedades(nombre) for nombre in FLUIDOS_SOPORTADOS})
+
+
+def iniciar_proceso_calculo(usar_tablas: bool) -> None:
+    """Initializer de los procesos del pool: el entorno se hereda del padre, el logging no."""
+    configurar_logging()
+    iniciar_motor(usar_tablas)
+
+
+def _pid_proceso() -> int:
+    """Tarea de calentamiento: ocupa brevemente un proceso del pool."""
+    time.sleep(0.05)
+    return os.getpid()
+
+
+class PoolCalculo:
+    """
+    Pool de procesos para el cálculo (PROCESOS_CALCULO > 0).
+    
+    Si un proceso muere, ProcessPoolExecutor queda inutilizable: el lote en
+    curso falla y el pool se recrea. Mientras el pool nuevo arranca, los
+    cálculos se ejecutan en hilos del propio worker.
+    """
+    
+    def __init__(self, procesos: int, usar_tablas: bool):
+        self.procesos = procesos
+        self.usar_tablas = usar_tablas
+        self._ejecutor = self._crear()
+        self._calentamiento: Optional[asyncio.Task] = None
+
+    def _crear(self) -> ProcessPoolExecutor:
+        # spawn: los procesos hijos no heredan hilos ni bloqueos tomados del padre
+        return ProcessPoolExecutor(
+            max_workers=self.procesos,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=iniciar_proceso_calculo,
+            initargs=(self.usar_tablas,)
+        )
+
+    async def calentar(self) -> None:
+        """Arranca e inicializa todos los procesos antes de atender solicitudes."""
+        pids = set()
+        while len(pids) < self.procesos:
+            pids.update(await asyncio.gather(
+                *(self._enviar(_pid_proceso) for _ in range(self.procesos))
+            ))
+
+    async def _recalentar(self) -> None:
+        try:
+            await self.calentar()
+        except BrokenProcessPool:
+            pass  # El pool volvió a romperse y ya se programó otro calentamiento
+
+    async def ejecutar(self, funcion, *args):
+        """Ejecuta `funcion` en el pool o, mientras se recrea, en un hilo."""
+        if self._calentamiento is not None and not self._calentamiento.done():
+            return await asyncio.to_thread(funcion, *args)
+        return await self._enviar(funcion, *args)
+
+    async def _enviar(self, funcion, *args):
+        """Envía `funcion` a un proceso del pool, recreándolo si se rompió."""
+        ejecutor = self._ejecutor
+        try:
+            return await asyncio.get_running_loop().run_in_executor(ejecutor, funcion, *args)
+        except BrokenProcessPool:
+            # Varios lotes pueden fallar con el mismo pool roto: se recrea una sola vez
+            if ejecutor is self._ejecutor:
+                logger.error("❌ Un proceso de cálculo terminó abruptamente; recreando el pool")
+                ejecutor.shutdown(wait=False, cancel_futures=True)
+                self._ejecutor = self._crear()
+                self._calentamiento = asyncio.create_task(self._recalentar())
+            raise
+
+    def cerrar(self) -> None:
+        """Cancela el calentamiento pendiente y cierra los procesos."""
+        if self._calentamiento is not None:
+            self._calentamiento.cancel()
+        self._ejecutor.shutdown(cancel_futures=True)
+
+
+async def ejecutar_calculo(pool: Optional[PoolCalculo], funcion, *args):
+    """Ejecuta código de cálculo bloqueante en el pool de procesos o, si no hay, en un hilo."""
+    if pool is None:
+        return await asyncio.to_thread(funcion, *args)
+    return await pool.ejecutar(funcion, *args)
+
+
+class ErrorCalculo(HTTPException):
+    """HTTPException serializable con pickle, para errores producidos en el pool de procesos."""
+    
+    def __reduce__(self):
+        return type(self), (self.status_code, self.detail, self.headers)
+
+
+Geometria = tuple[float, float, float]  # (d_int, longitud, eD)
+
+
+@lru_cache(maxsize=1024)
+def geometria_tuberia(
+    d_ext: float,
+    espesor: float = ESPESOR_PARED,
+    longitud: float = 100,
+    rugosidad: float = RUGOSIDAD_ACERO
+) -> Geometria:
+    """
+    Calcula la geometría hidráulica de la tubería.
+    
+    Args:
+        d_ext: Diámetro exterior (m)
+        espesor: Espesor de pared (m)
+        longitud: Longitud de la tubería (m)
+        rugosidad: Rugosidad absoluta, acero comercial estándar (m)
         
-        Args:
-            fluido: Nombre del fluido (código CoolProp)
-            P: Presión absoluta (Pa)
-            T: Temperatura absoluta (K)
-            v: Velocidad de flujo (m/s)
-            k_total: Suma de coeficientes K de accesorios
-            
-        Returns:
-            ResultadoCalculo con todos los parámetros calculados
-        """
-        advertencias = []
+    Returns:
+        (d_int, longitud, eD) con la rugosidad relativa ya precalculada
+    """
+    d_int = d_ext - (2 * espesor)
+    
+    if d_int <= 0:
+        raise ValueError(
+            f"Diámetro interno inválido ({d_int:.4f}m). "
+            f"El espesor de pared ({espesor}m) es mayor que el radio."
+        )
+    return d_int, longitud, rugosidad / d_int
+
+
+@lru_cache(maxsize=4096)
+def propiedades(fluido: str, P: float, T: float) -> tuple[float, float]:
+    """
+    Obtiene (densidad, viscosidad) memoizadas por punto de operación exacto.
+    
+    No se agrupan puntos cercanos: cerca de una frontera de fase, una
+    diferencia mínima de P o T cambia la fase y la densidad en órdenes de
+    magnitud. Los barridos de diseño repiten valores exactos.
+    """
+    estado = ESTADOS[fluido]
+    with BLOQUEOS_ESTADO[fluido]:
+        estado.update(CP.PT_INPUTS, P, T)
+        return estado.rhomass(), estado.viscosity()
+
+
+def propiedades_lote(
+    fluido: str,
+    P: np.ndarray,
+    T: np.ndarray,
+    interpolar: bool = False
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Obtiene densidad y viscosidad para un lote de puntos del mismo fluido.
+    
+    Con `interpolar` y tablas activas, los lotes grandes se interpolan de una
+    vez y solo los puntos fuera de las celdas fiables pasan por CoolProp. Los
+    puntos inválidos se devuelven como valores no finitos.
+    """
+    tabla = TABLAS.get(fluido) if interpolar else None
+    if tabla is not None and len(P) >= LOTE_MIN_INTERPOLACION:
+        rho, mu = tabla.interpolar(P, T)
+    else:
+        rho = np.full(len(P), np.nan)
+        mu = np.full(len(P), np.nan)
+
+    for i in np.flatnonzero(np.isnan(rho)):
+        try:
+            rho[i], mu[i] = propiedades(fluido, float(P[i]), float(T[i]))
+        except ValueError:
+            rho[i] = mu[i] = np.inf
+    return rho, mu
+
+
+def _compilar(func):
+    """Compila el kernel con numba si está instalado (firma explícita, cacheado en disco)."""
+    if njit is None:
+        return func
+    firma = "UniTuple(float64, 2)(float64, float64, float64, float64, float64, float64, float64)"
+    return njit(firma, cache=True, fastmath=True)(func)
+
+
+@_compilar
+def _kernel_darcy(
+    re: float,
+    rho: float,
+    v: float,
+    d_int: float,
+    L: float,
+    eD: float,
+    k_total: float
+) -> tuple[float, float]:
+    """
+    Factor de fricción y caída de presión (Darcy-Weisbach Extendida).
+    
+    - Laminar (Re < 2300): solución exacta 64/Re
+    - Turbulento (Re ≥ 4000): forma explícita de Haaland
+    
+    La zona de transición no pasa por el kernel: usa la correlación general de fluids.
+    """
+    if re < 2300.0:
+        f = 64.0 / re
+    else:
+        f = (-1.8 * _log10((eD / 3.7) ** 1.11 + 6.9 / re)) ** -2
+    delta_p = (f * (L / d_int) + k_total) * (0.5 * rho * v * v)
+    return f, delta_p
+
+
+# Tablas indexadas por el número de umbrales superados (Re: 2300/4000, v: 15/25 m/s)
+REGIMENES = ("Laminar", "Transición", "Turbulento")
+AVISOS_REGIMEN = (
+    None,
+    "Flujo en zona de transición crítica. Resultados pueden ser inestables.",
+    None
+)
+AVISOS_VELOCIDAD = (
+    None,
+    "Velocidad alta (>15 m/s). Considerar diseño antierosión.",
+    "Velocidad excesiva (>25 m/s). Riesgo de erosión y ruido."
+)
+
+
+def clasificar_flujo(re: float, v: float) -> tuple[str, list[str]]:
+    """Determina el régimen de flujo y las advertencias de diseño de un punto."""
+    i = (re >= 2300) + (re >= 4000)
+    advertencias = []
+    aviso = AVISOS_REGIMEN[i]
+    if aviso:
+        advertencias.append(aviso)
+    aviso = AVISOS_VELOCIDAD[(v > 15) + (v > 25)]
+    if aviso:
+        advertencias.append(aviso)
+    return REGIMENES[i], advertencias
+
+
+def calcular_resultados(
+    geometria: Geometria,
+    fluido: str,
+    P: float,
+    T: float,
+    v: float,
+    k_total: float,
+    propiedades_fluido: Optional[tuple[float, float]] = None
+) -> ResultadoCalculo:
+    """
+    Ejecuta el cálculo hidráulico completo.
+    
+    Args:
+        geometria: (d_int, longitud, eD) de geometria_tuberia
+        fluido: Nombre del fluido (código CoolProp)
+        P: Presión absoluta (Pa)
+        T: Temperatura absoluta (K)
+        v: Velocidad de flujo (m/s)
+        k_total: Suma de coeficientes K de accesorios
+        propiedades_fluido: (densidad, viscosidad) ya calculadas, si se dispone de ellas
         
-        # A. Obtención de propiedades termofísicas reales
+    Returns:
+        ResultadoCalculo con todos los parámetros calculados
+    """
+    d_int, L, eD = geometria
+    
+    # A. Obtención de propiedades termofísicas reales
+    if propiedades_fluido is not None:
+        rho, mu = propiedades_fluido
+    else:
         try:
-            rho = CP.PropsSI('D', 'P', P, 'T', T, fluido)  # Densidad (kg/m³)
-            mu = CP.PropsSI('V', 'P', P, 'T', T, fluido)   # Viscosidad dinámica (Pa·s)
+            # Densidad (kg/m³) y viscosidad dinámica (Pa·s)
+            rho, mu = propiedades(fluido, P, T)
         except Exception as e:
             logger.error(f"Error CoolProp: {e}")
-            raise HTTPException(
+            raise ErrorCalculo(
                 status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                 detail=f"Error al obtener propiedades del fluido '{fluido}': {str(e)}. "
                        f"Verifique que la combinación presión-temperatura sea válida."
             )
 
-        # B. Cálculo del Número de Reynolds
-        if v == 0:
-            # Flujo estático
-            return ResultadoCalculo(
-                delta_p=0.0,
-                reynolds=0,
-                factor_f=0.0,
-                densidad=round(rho, 4),
-                viscosidad=mu,
-                diametro_interno=round(self.d_int, 4),
-                regimen="Estático",
-                advertencias=["Velocidad cero: sin flujo"]
-            )
+    # B. Cálculo del Número de Reynolds
+    if v == 0:
+        # Flujo estático
+        return ResultadoCalculo(
+            delta_p=0.0,
+            reynolds=0,
+            factor_f=0.0,
+            densidad=rho,
+            viscosidad=mu,
+            diametro_interno=d_int,
+            regimen="Estático",
+            advertencias=["Velocidad cero: sin flujo"]
+        )
 
-        re = fluids.core.Reynolds(V=v, D=self.d_int, rho=rho, mu=mu)
-        
-        # Determinar régimen de flujo
-        if re < 2300:
-            regimen = "Laminar"
-        elif re < 4000:
-            regimen = "Transición"
-            advertencias.append("Flujo en zona de transición crítica. Resultados pueden ser inestables.")
+    re = rho * v * d_int / mu
+    regimen, advertencias = clasificar_flujo(re, v)
+
+    # C. Factor de Fricción y Caída de Presión (Darcy-Weisbach Extendida)
+    try:
+        if 2300 <= re < 4000:
+            f = _friction_factor(Re=re, eD=eD)
+            factor_tuberia = f * (L / d_int)
+            termino_energia = (rho * v**2) / 2
+            delta_p = (factor_tuberia + k_total) * termino_energia
         else:
-            regimen = "Turbulento"
+            f, delta_p = _kernel_darcy(re, rho, v, d_int, L, eD, k_total)
+    except Exception as e:
+        logger.error(f"Error calculando fricción: {e}")
+        raise ErrorCalculo(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error al calcular factor de fricción: {str(e)}"
+        )
 
-        # C. Cálculo del Factor de Fricción
+    return ResultadoCalculo(
+        delta_p=delta_p,
+        reynolds=int(re),
+        factor_f=f,
+        densidad=rho,
+        viscosidad=mu,
+        diametro_interno=d_int,
+        regimen=regimen,
+        advertencias=advertencias
+    )
+
+
+def calcular_lote(
+    fluido: str,
+    puntos: list[tuple[Geometria, float, float, float, float]]
+) -> list:
+    """
+    Resuelve un lote de simulaciones del mismo fluido.
+    
+    Args:
+        fluido: Nombre del fluido (código CoolProp)
+        puntos: Tuplas (geometria, P, T, v, k_total)
+        
+    Returns:
+        Por cada punto, su ResultadoCalculo o la excepción que produjo
+    """
+    rho, mu = propiedades_lote(
+        fluido,
+        np.array([punto[1] for punto in puntos], dtype=float),
+        np.array([punto[2] for punto in puntos], dtype=float)
+    )
+
+    resultados = []
+    for (geometria, P, T, v, k_total), rho_i, mu_i in zip(puntos, rho, mu):
+        # Los puntos inválidos se recalculan de forma escalar para reportar el error de CoolProp
+        propiedades_fluido = (float(rho_i), float(mu_i)) if np.isfinite(rho_i) and np.isfinite(mu_i) else None
         try:
-            f = fluids.friction.friction_factor(Re=re, eD=self.rugosidad / self.d_int)
+            resultados.append(calcular_resultados(
+                geometria=geometria,
+                fluido=fluido,
+                P=P,
+                T=T,
+                v=v,
+                k_total=k_total,
+                propiedades_fluido=propiedades_fluido
+            ))
         except Exception as e:
-            logger.error(f"Error calculando fricción: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error al calcular factor de fricción: {str(e)}"
-            )
+            resultados.append(e)
+    return resultados
+
 
-        # D. Cálculo de Caída de Presión (Darcy-Weisbach Extendida)
-        factor_tuberia = f * (self.L / self.d_int)
-        termino_energia = (rho * v**2) / 2
-        delta_p = (factor_tuberia + k_total) * termino_energia
+def calcular_barrido(
+    fluido: str,
+    P: np.ndarray,
+    T: np.ndarray,
+    d_ext: np.ndarray,
+    v: np.ndarray,
+    L: np.ndarray,
+    k_total: np.ndarray
+) -> ResultadoCalculoBatch:
+    """
+    Ejecuta el cálculo hidráulico sobre arrays de puntos con NumPy.
+    
+    Los arrays deben ser difundibles (broadcast) entre sí. Solo los puntos
+    en zona de transición se resuelven uno a uno con fluids.
+    
+    Raises:
+        ValueError: Si algún punto tiene geometría o propiedades inválidas
+    """
+    P, T, d_ext, v, L, k_total = np.broadcast_arrays(P, T, d_ext, v, L, k_total)
 
-        # E. Verificaciones de diseño
-        if v > 25:
-            advertencias.append("Velocidad excesiva (>25 m/s). Riesgo de erosión y ruido.")
-        elif v > 15:
-            advertencias.append("Velocidad alta (>15 m/s). Considerar diseño antierosión.")
+    d_int = d_ext - 2 * ESPESOR_PARED
+    if (d_int <= 0).any():
+        i = int(np.argmax(d_int <= 0))
+        raise ValueError(
+            f"Punto {i}: Diámetro interno inválido ({d_int[i]:.4f}m). "
+            f"El espesor de pared ({ESPESOR_PARED}m) es mayor que el radio."
+        )
+    eD = RUGOSIDAD_ACERO / d_int
 
-        return ResultadoCalculo(
-            delta_p=round(delta_p, 2),
-            reynolds=int(re),
-            factor_f=round(float(f), 6),
-            densidad=round(rho, 4),
-            viscosidad=mu,
-            diametro_interno=round(self.d_int, 4),
-            regimen=regimen,
-            advertencias=advertencias
+    # El cliente eligió el barrido: aquí sí se aceptan propiedades interpoladas
+    rho, mu = propiedades_lote(fluido, P, T, interpolar=True)
+    invalidos = ~(np.isfinite(rho) & np.isfinite(mu))
+    if invalidos.any():
+        i = int(np.argmax(invalidos))
+        raise ValueError(
+            f"Punto {i}: no se pudieron obtener propiedades del fluido '{fluido}' "
+            f"(P={P[i]:.0f} Pa, T={T[i]:.2f} K). "
+            f"Verifique que la combinación presión-temperatura sea válida."
         )
 
+    estatico = v == 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        re = rho * v * d_int / mu
+        f = np.where(
+            re < 2300,
+            64.0 / re,
+            (-1.8 * np.log10((eD / 3.7) ** 1.11 + 6.9 / re)) ** -2
+        )
+    for i in np.flatnonzero((re >= 2300) & (re < 4000)):
+        f[i] = _friction_factor(Re=re[i], eD=eD[i])
+    f[estatico] = 0.0
+    delta_p = (f * (L / d_int) + k_total) * (0.5 * rho * v * v)
+
+    regimenes, advertencias = [], []
+    for re_i, v_i, estatico_i in zip(re.tolist(), v.tolist(), estatico.tolist()):
+        if estatico_i:
+            regimen, avisos = "Estático", ["Velocidad cero: sin flujo"]
+        else:
+            regimen, avisos = clasificar_flujo(re_i, v_i)
+        regimenes.append(regimen)
+        advertencias.append(avisos)
+
+    return ResultadoCalculoBatch(
+        delta_p=delta_p.tolist(),
+        reynolds=re.astype(int).tolist(),
+        factor_f=f.tolist(),
+        densidad=rho.tolist(),
+        viscosidad=mu.tolist(),
+        diametro_interno=d_int.tolist(),
+        regimen=regimenes,
+        advertencias=advertencias
+    )
+
+
+class LoteadorCalculos:
+    """
+    Agrupa las simulaciones concurrentes por fluido (micro-batching).
+    
+    Cada fluido tiene su cola y su tarea consumidora: las solicitudes que
+    llegan mientras se resuelve un lote forman el siguiente, que se resuelve
+    en una sola pasada en un hilo o en el pool de procesos. Opcionalmente, la
+    primera solicitud abre una ventana corta para acumular más (más latencia).
+    """
+    
+    def __init__(self, ventana: float = 0.0, pool: Optional[PoolCalculo] = None):
+        self.ventana = ventana  # Segundos de espera para acumular el lote
+        self.pool = pool
+        self._colas: dict[str, asyncio.Queue] = {}
+        self._tareas: list[asyncio.Task] = []
+
+    def iniciar(self) -> None:
+        """Crea una cola y una tarea consumidora por fluido soportado."""
+        for fluido in FLUIDOS_SOPORTADOS:
+            cola = asyncio.Queue()
+            self._colas[fluido] = cola
+            self._tareas.append(asyncio.create_task(self._consumir(fluido, cola)))
+
+    async def detener(self) -> None:
+        """Cancela las tareas consumidoras."""
+        for tarea in self._tareas:
+            tarea.cancel()
+        await asyncio.gather(*self._tareas, return_exceptions=True)
+        self._tareas.clear()
+        self._colas.clear()
+
+    async def calcular(
+        self,
+        geometria: Geometria,
+        fluido: str,
+        P: float,
+        T: float,
+        v: float,
+        k_total: float
+    ) -> ResultadoCalculo:
+        """Encola una simulación y espera su resultado."""
+        futuro = asyncio.get_running_loop().create_future()
+        self._colas[fluido].put_nowait((geometria, P, T, v, k_total, futuro))
+        return await futuro
+
+    async def _consumir(self, fluido: str, cola: asyncio.Queue) -> None:
+        while True:
+            lote = [await cola.get()]
+            if self.ventana > 0:
+                await asyncio.sleep(self.ventana)
+            while not cola.empty():
+                lote.append(cola.get_nowait())
+            # Descartar las solicitudes que el cliente canceló mientras esperaban
+            lote = [item for item in lote if not item[-1].done()]
+            if not lote:
+                continue
+
+            # CoolProp y fluids son código nativo bloqueante: se ejecutan fuera del event loop
+            try:
+                resultados = await ejecutar_calculo(
+                    self.pool, calcular_lote, fluido, [item[:-1] for item in lote]
+                )
+            except Exception as e:
+                # Fallo del lote completo (p. ej. un proceso del pool murió; el pool ya se recreó)
+                resultados = [e] * len(lote)
+            for (*_, futuro), resultado in zip(lote, resultados):
+                if futuro.done():
+                    continue
+                if isinstance(resultado, Exception):
+                    futuro.set_exception(resultado)
+                else:
+                    futuro.set_result(resultado)
+
 
 # ============================================================================
 # ENDPOINTS
 # ============================================================================
 
+def _cuerpo_json(modelo: type[BaseModel]) -> dict:
+    """Documenta en OpenAPI el cuerpo JSON de un endpoint que lo valida manualmente."""
+    return {
+        "requestBody": {
+            "required": True,
+            "content": {"application/json": {"schema": modelo.model_json_schema()}}
+        }
+    }
+
+
+async def _validar_cuerpo(request: Request, modelo: type[BaseModel]):
+    """
+    Decodifica y valida el cuerpo JSON en una sola pasada de pydantic-core.
+    
+    Evita el json.loads en Python que FastAPI hace antes de validar; los
+    errores se reportan con el mismo formato 422 que la validación estándar.
+    Como en FastAPI, solo se decodifica un cuerpo declarado como JSON: un
+    `text/plain` (petición CORS simple, sin preflight) se rechaza con 422.
+    """
+    cuerpo = await request.body()
+    tipo = request.headers.get("content-type", "").partition(";")[0].strip().lower()
+    subtipo = tipo.partition("/")[2]
+    try:
+        if subtipo == "json" or subtipo.endswith("+json"):
+            return modelo.model_validate_json(cuerpo)
+        # Mismo error que FastAPI para un cuerpo no JSON (model_attributes_type)
+        return modelo.model_validate(cuerpo, from_attributes=True)
+    except ValidationError as e:
+        raise RequestValidationError([
+            {**error, "loc": ("body", *error["loc"])}
+            for error in e.errors(include_url=False)
+        ])
+
+
 @app.get("/health", response_model=HealthResponse, tags=["Sistema"])
 async def health_check():
     """
@@ -356,11 +986,8 @@ async def health_check():
     
     Retorna el estado del servicio y los fluidos disponibles.
     """
-    return HealthResponse(
-        status="healthy",
-        version="2.0.0",
-        fluidos_disponibles=FLUIDOS_SOPORTADOS
-    )
+    # El cuerpo es constante: se serializa una sola vez en el startup
+    return Response(content=app.state.health_bytes, media_type="application/json")
 
 
 @app.post(
@@ -372,9 +999,10 @@ async def health_check():
         200: {"description": "Cálculo exitoso"},
         422: {"description": "Datos de entrada inválidos o fuera de rango físico"},
         500: {"description": "Error interno del motor de cálculo"}
-    }
+    },
+    openapi_extra=_cuerpo_json(DatosEntrada)
 )
-async def ejecutar_simulacion(datos: DatosEntrada):
+async def ejecutar_simulacion(request: Request):
     """
     Recibe los datos del sistema y devuelve el análisis hidráulico detallado.
     
@@ -397,12 +1025,17 @@ async def ejecutar_simulacion(datos: DatosEntrada):
     - **regimen**: Tipo de flujo (Laminar/Transición/Turbulento)
     - **advertencias**: Alertas de diseño si aplican
     """
-    logger.info(f"📊 Calculando: {datos.fluido} @ {datos.presion/1e5:.1f} bar, {datos.temperatura-273.15:.1f}°C")
+    datos = await _validar_cuerpo(request, DatosEntrada)
+    logger.info(
+        "📊 Calculando: %s @ %.1f bar, %.1f°C",
+        datos.fluido, datos.presion / 1e5, datos.temperatura - 273.15
+    )
     
     try:
-        motor = MotorHidraulico(d_ext=datos.diametro, longitud=datos.longitud)
+        geometria = geometria_tuberia(d_ext=datos.diametro, longitud=datos.longitud)
         
-        resultado = motor.calcular_resultados(
+        resultado = await app.state.loteador.calcular(
+            geometria=geometria,
             fluido=datos.fluido,
             P=datos.presion,
             T=datos.temperatura,
@@ -410,7 +1043,7 @@ async def ejecutar_simulacion(datos: DatosEntrada):
             k_total=datos.k_accesorios
         )
         
-        logger.info(f"✅ Resultado: ΔP={resultado.delta_p:.2f} Pa, Re={resultado.reynolds}")
+        logger.info("✅ Resultado: ΔP=%.2f Pa, Re=%s", resultado.delta_p, resultado.reynolds)
         return resultado
         
     except HTTPException:
@@ -429,4 +1062,58 @@ async def ejecutar_simulacion(datos: DatosEntrada):
         )
 
 
-# Para ejecutar: uvicorn main:app --reload --host 0.0.0.0 --port 8000
\ No newline at end of file
+@app.post(
+    "/calcular_batch",
+    response_model=ResultadoCalculoBatch,
+    tags=["Cálculos"],
+    summary="Ejecutar barrido de simulaciones",
+    responses={
+        200: {"description": "Cálculo exitoso"},
+        422: {"description": "Datos de entrada inválidos o fuera de rango físico"},
+        500: {"description": "Error interno del motor de cálculo"}
+    },
+    openapi_extra=_cuerpo_json(DatosEntradaBatch)
+)
+async def ejecutar_simulacion_batch(request: Request):
+    """
+    Ejecuta en una sola solicitud un barrido de simulaciones del mismo fluido.
+    
+    Recibe los mismos parámetros que `/calcular`, pero cada uno como lista.
+    Las listas de un único valor se aplican a todos los puntos. Devuelve
+    los resultados como listas alineadas con los puntos de entrada.
+    """
+    datos = await _validar_cuerpo(request, DatosEntradaBatch)
+    logger.info("📊 Calculando lote: %s", datos.fluido)
+    
+    try:
+        resultado = await ejecutar_calculo(
+            app.state.pool,
+            calcular_barrido,
+            datos.fluido,
+            np.asarray(datos.presion, dtype=float),
+            np.asarray(datos.temperatura, dtype=float),
+            np.asarray(datos.diametro, dtype=float),
+            np.asarray(datos.velocidad, dtype=float),
+            np.asarray(datos.longitud, dtype=float),
+            np.asarray(datos.k_accesorios, dtype=float)
+        )
+        
+        logger.info("✅ Lote resuelto: %d puntos", len(resultado.delta_p))
+        return resultado
+        
+    except ValueError as e:
+        logger.warning(f"⚠️ Validación fallida: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"❌ Error inesperado: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error interno del servidor: {str(e)}"
+        )
+
+
+# Para ejecutar (desarrollo): uvicorn main:app --reload --host 0.0.0.0 --port 8000
+# Para ejecutar (producción): uvicorn main:app --loop uvloop --http httptools --workers 4 --host 0.0.0.0 --port 8000
\ No newline at end of file